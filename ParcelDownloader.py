@@ -23,12 +23,18 @@
 ***************************************************************************
 """
 
+import json
+import math
 import os
-from typing import Any, Optional
+import struct
+import sys
+from array import array
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Any, Optional
 import concurrent.futures
 import threading
 
-from qgis.PyQt.QtCore import QCoreApplication, QSettings
+from qgis.PyQt.QtCore import QCoreApplication, QSettings, QVariant
 from qgis.PyQt.QtGui import QColor
 from qgis.core import (
     QgsFeatureSink,
@@ -49,7 +55,6 @@ from qgis.core import (
     QgsFeature,
     QgsGeometry,
     QgsPointXY,
-    QgsProject,
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
     QgsRectangle,
@@ -68,7 +73,96 @@ from qgis.core import (
     QgsVectorLayerSimpleLabeling,
     QgsMapLayer
 )
-import requests # Required for API calls
+
+if TYPE_CHECKING:
+    import requests
+
+try:
+    # orjson decodes straight from bytes and is much faster when available
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# WKB built from GeoJSON is packed in native byte order, flagged in its header
+WKB_BYTE_ORDER = 1 if sys.byteorder == "little" else 0
+WKB_POLYGON = 3
+WKB_MULTIPOLYGON = 6
+
+# Pre-serialized get-parcel-info request body; the FID is inserted as a JSON string
+INFO_PAYLOAD_TEMPLATE = b'{"fid": %s}'
+
+# Parcel attributes copied from the API as (name, type, converter, default), in output field order
+PARCEL_ATTRIBUTES = (
+    ("gml_id", QVariant.String, str, ""),
+    ("administrativeunit", QVariant.String, str, ""),
+    ("comune_name", QVariant.String, str, ""),
+    ("footprint_sqm", QVariant.Double, float, 0.0),
+    ("elevation_min", QVariant.Double, float, 0.0),
+    ("elevation_max", QVariant.Double, float, 0.0),
+    ("class", QVariant.String, str, ""),
+    ("subtype", QVariant.String, str, ""),
+    ("landcover", QVariant.String, str, ""),
+    ("densita_abitativa", QVariant.Double, float, 0.0),
+    ("eta_media", QVariant.Double, float, 0.0),
+    ("tasso_occupazione", QVariant.Double, float, 0.0),
+    ("flood_risk", QVariant.String, str, ""),
+    ("landslide_risk", QVariant.String, str, ""),
+    ("seismic_risk", QVariant.String, str, ""),
+    ("buildings_count", QVariant.Int, int, 0),
+)
+
+# Worker threads used to download parcel details, and the matching connection pool size
+MAX_WORKERS = 15
+
+# Extra vertices added along each bbox edge before reprojecting it to EPSG:4326
+BBOX_EDGE_POINTS = 7
+
+# Bounding boxes wider or taller than this many degrees are split into tiles
+TILE_SIZE_DEGREES = 0.5
+# Hard cap on get-parcels requests per run; tiles grow beyond TILE_SIZE_DEGREES to stay under it
+MAX_BBOX_TILES = 16
+# Concurrent get-parcels requests while fetching tiles
+TILE_WORKERS = 4
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """Return the shared API session, keeping connections alive across requests and runs."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Imported on first use so loading the plugin does not pull in requests/urllib3
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            # The API's POST endpoints are read-only queries, so they are safe to retry on
+            # connect errors and the listed statuses. Read timeouts are not retried: a slow
+            # query would only be re-sent (and billed) again, and should surface as a timeout.
+            retry_options = {
+                "total": 5,
+                "read": False,
+                "backoff_factor": 0.5,
+                "status_forcelist": [429, 500, 502, 503, 504],
+                "respect_retry_after_header": True,
+                "raise_on_status": False,
+            }
+            try:
+                retry = Retry(allowed_methods=["POST"], **retry_options)
+            except TypeError:
+                # urllib3 < 1.26 (e.g. QGIS 3.16 on Ubuntu 20.04) only accepts method_whitelist
+                retry = Retry(method_whitelist=["POST"], **retry_options)
+
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=MAX_WORKERS,
+                max_retries=retry
+            ))
+            _session = session
+        return _session
 
 
 class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
@@ -83,6 +177,7 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
     API_KEY = "API_KEY"
     AUTH_TOKEN = "AUTH_TOKEN"
     SAVE_API_KEY = "SAVE_API_KEY"
+    VALIDATE_GEOMETRIES = "VALIDATE_GEOMETRIES"
 
     # Output parameters
     OUTPUT_PARCELS = "OUTPUT_PARCELS"
@@ -92,6 +187,7 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
     SETTINGS_GROUP = "ZornadeParcelDownloader"
     SETTINGS_API_KEY = "rapidApiKey"
     SETTINGS_AUTH_TOKEN = "authToken"
+    SETTINGS_DEBUG = "debugLogging"
 
     def tr(self, string):
         """
@@ -165,8 +261,10 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
         """
         # --- API Key Management ---
         settings = QSettings()
-        saved_api_key = settings.value(f"{self.SETTINGS_GROUP}/{self.SETTINGS_API_KEY}", "")
-        saved_auth_token = settings.value(f"{self.SETTINGS_GROUP}/{self.SETTINGS_AUTH_TOKEN}", "")
+        settings.beginGroup(self.SETTINGS_GROUP)
+        saved_api_key = settings.value(self.SETTINGS_API_KEY, "")
+        saved_auth_token = settings.value(self.SETTINGS_AUTH_TOKEN, "")
+        settings.endGroup()
         
         if saved_api_key:
             api_key_hint = f"Current saved key: {saved_api_key[:8]}...{saved_api_key[-4:]} (masked for security)"
@@ -215,6 +313,15 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        # --- Geometry Validation ---
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.VALIDATE_GEOMETRIES,
+                self.tr("Validate parcel geometries and skip invalid ones (slower)"),
+                defaultValue=False
+            )
+        )
+
         # --- Output Layer ---
         self.addParameter(
             QgsProcessingParameterFeatureSink(
@@ -254,6 +361,8 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
         """
         Main processing logic.
         """
+        import requests  # Deferred until the algorithm actually runs
+
         # Get credentials from parameters
         api_key = self.parameterAsString(parameters, self.API_KEY, context).strip()
         auth_token = self.parameterAsString(parameters, self.AUTH_TOKEN, context).strip()
@@ -266,13 +375,15 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
         
         # Handle credential saving/updating/removing
         settings = QSettings()
-        current_saved_api = settings.value(f"{self.SETTINGS_GROUP}/{self.SETTINGS_API_KEY}", "")
-        current_saved_token = settings.value(f"{self.SETTINGS_GROUP}/{self.SETTINGS_AUTH_TOKEN}", "")
+        settings.beginGroup(self.SETTINGS_GROUP)
+        current_saved_api = settings.value(self.SETTINGS_API_KEY, "")
+        current_saved_token = settings.value(self.SETTINGS_AUTH_TOKEN, "")
+        debug_logging = settings.value(self.SETTINGS_DEBUG, False, type=bool)
         
         if save_api_key:
             if current_saved_api != api_key or current_saved_token != auth_token:
-                settings.setValue(f"{self.SETTINGS_GROUP}/{self.SETTINGS_API_KEY}", api_key)
-                settings.setValue(f"{self.SETTINGS_GROUP}/{self.SETTINGS_AUTH_TOKEN}", auth_token)
+                settings.setValue(self.SETTINGS_API_KEY, api_key)
+                settings.setValue(self.SETTINGS_AUTH_TOKEN, auth_token)
                 if current_saved_api and current_saved_token:
                     feedback.pushInfo(self.tr("Credentials updated and saved for future sessions."))
                 else:
@@ -281,9 +392,12 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
                 feedback.pushInfo(self.tr("Using saved credentials."))
         else:
             if current_saved_api or current_saved_token:
-                settings.remove(f"{self.SETTINGS_GROUP}/{self.SETTINGS_API_KEY}")
-                settings.remove(f"{self.SETTINGS_GROUP}/{self.SETTINGS_AUTH_TOKEN}")
+                settings.remove(self.SETTINGS_API_KEY)
+                settings.remove(self.SETTINGS_AUTH_TOKEN)
                 feedback.pushInfo(self.tr("Saved credentials removed. Current credentials will only be used for this session."))
+        settings.endGroup()
+
+        validate_geometries = self.parameterAsBool(parameters, self.VALIDATE_GEOMETRIES, context)
 
         bbox_extent = self.parameterAsExtent(parameters, self.BBOX, context)
         bbox_crs = self.parameterAsExtentCrs(parameters, self.BBOX, context)
@@ -291,9 +405,14 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
         # Handle coordinate transformation
         target_crs = QgsCoordinateReferenceSystem("EPSG:4326")
         
-        if bbox_crs != target_crs:
-            transform = QgsCoordinateTransform(bbox_crs, target_crs, QgsProject.instance())
-            bbox_extent_4326 = transform.transformBoundingBox(bbox_extent)
+        # Compare authids rather than full CRS definitions; WGS84 extents need no transform
+        if bbox_crs.authid() != target_crs.authid():
+            # Honour the datum transformations configured for the current project
+            transform = QgsCoordinateTransform(bbox_crs, target_crs, context.transformContext())
+            # Densify the extent's outline lightly instead of transformBoundingBox's 21x21 sample grid
+            bbox_outline = QgsGeometry.fromRect(bbox_extent).densifyByCount(BBOX_EDGE_POINTS)
+            bbox_outline.transform(transform)
+            bbox_extent_4326 = bbox_outline.boundingBox()
             feedback.pushInfo(self.tr("Transformed bounding box from {} to EPSG:4326".format(bbox_crs.authid())))
         else:
             bbox_extent_4326 = bbox_extent
@@ -309,25 +428,10 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
 
         # Define output fields based on zornade API response
         fields = QgsFields()
-        from qgis.PyQt.QtCore import QVariant
-        
         fields.append(QgsField("fid", QVariant.String))
-        fields.append(QgsField("gml_id", QVariant.String))
-        fields.append(QgsField("administrativeunit", QVariant.String))
-        fields.append(QgsField("comune_name", QVariant.String))
-        fields.append(QgsField("footprint_sqm", QVariant.Double))
-        fields.append(QgsField("elevation_min", QVariant.Double))
-        fields.append(QgsField("elevation_max", QVariant.Double))
-        fields.append(QgsField("class", QVariant.String))
-        fields.append(QgsField("subtype", QVariant.String))
-        fields.append(QgsField("landcover", QVariant.String))
-        fields.append(QgsField("densita_abitativa", QVariant.Double))
-        fields.append(QgsField("eta_media", QVariant.Double))
-        fields.append(QgsField("tasso_occupazione", QVariant.Double))
-        fields.append(QgsField("flood_risk", QVariant.String))
-        fields.append(QgsField("landslide_risk", QVariant.String))
-        fields.append(QgsField("seismic_risk", QVariant.String))
-        fields.append(QgsField("buildings_count", QVariant.Int))
+        for name, field_type, _, _ in PARCEL_ATTRIBUTES:
+            fields.append(QgsField(name, field_type))
+        fields.append(QgsField("label", QVariant.String))
 
         (sink, dest_id) = self.parameterAsSink(
             parameters,
@@ -352,74 +456,55 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
             "User-Agent": "Zornade-QGIS-Plugin/1.0.0"
         }
 
+        executor = None
+
         try:
+            session = get_session()
+
             # Step 1: Get parcel FIDs using bounding box only
             get_parcels_url = "{}/get-parcels".format(self.API_BASE_URL)
-            
-            parcels_payload = {
-                "queryType": "bbox",
-                "params": [
-                    bbox_extent_4326.xMinimum(),
-                    bbox_extent_4326.yMinimum(),
-                    bbox_extent_4326.xMaximum(),
-                    bbox_extent_4326.yMaximum()
-                ]
-            }
-            
-            feedback.pushInfo(self.tr("Requesting parcels within bounding box..."))
-            feedback.pushInfo(self.tr("Bounding box: [{:.6f}, {:.6f}, {:.6f}, {:.6f}]".format(
-                bbox_extent_4326.xMinimum(), bbox_extent_4326.yMinimum(),
-                bbox_extent_4326.xMaximum(), bbox_extent_4326.yMaximum()
-            )))
-            
-            parcels_response = requests.post(get_parcels_url, headers=headers, json=parcels_payload, timeout=30)
-            
-            if parcels_response.status_code == 401:
-                raise QgsProcessingException(
-                    self.tr("Authentication failed. Please check your RapidAPI key and authorization token. "
-                           "Ensure you have an active subscription to the service.")
-                )
-            elif parcels_response.status_code == 403:
-                raise QgsProcessingException(
-                    self.tr("Access forbidden. Please verify your subscription is active and you have "
-                           "permission to access this API endpoint.")
-                )
-            elif parcels_response.status_code == 429:
-                raise QgsProcessingException(
-                    self.tr("Rate limit exceeded. Please wait a moment and try again with a smaller area.")
-                )
-            elif parcels_response.status_code != 200:
-                response_text = parcels_response.text[:500]  # Limit error message length
-                raise QgsProcessingException(
-                    self.tr("API request failed with status {}: {}".format(
-                        parcels_response.status_code, response_text
-                    ))
-                )
-            
-            try:
-                parcels_data = parcels_response.json()
-            except ValueError as e:
-                raise QgsProcessingException(
-                    self.tr("Invalid JSON response from API. Please try again later.")
-                )
-            
-            # Handle the correct API response format
-            if parcels_data.get("success") and "data" in parcels_data:
-                parcel_fids = parcels_data["data"]
-                total_found = len(parcel_fids)
-                feedback.pushInfo(self.tr("Found {} parcels in the specified area".format(total_found)))
-                
-                # Warn for large datasets
-                if total_found > 1000:
-                    feedback.pushWarning(self.tr(
-                        "Large number of parcels found ({}). Processing may take several minutes. "
-                        "Consider using a smaller bounding box for faster results."
-                    ).format(total_found))
-                elif total_found > 100:
-                    feedback.pushInfo(self.tr(
-                        "Processing {} parcels. This may take a few minutes."
-                    ).format(total_found))
-            else:
+
+            def fetch_parcel_fids(bounds):
+                """Return the parcel FIDs inside one (xmin, ymin, xmax, ymax) extent."""
+                parcels_payload = {
+                    "queryType": "bbox",
+                    "params": list(bounds)
+                }
+                parcels_response = session.post(get_parcels_url, headers=headers, json=parcels_payload, timeout=(5, 30))
+
+                if parcels_response.status_code == 401:
+                    raise QgsProcessingException(
+                        self.tr("Authentication failed. Please check your RapidAPI key and authorization token. "
+                               "Ensure you have an active subscription to the service.")
+                    )
+                elif parcels_response.status_code == 403:
+                    raise QgsProcessingException(
+                        self.tr("Access forbidden. Please verify your subscription is active and you have "
+                               "permission to access this API endpoint.")
+                    )
+                elif parcels_response.status_code == 429:
+                    raise QgsProcessingException(
+                        self.tr("Rate limit exceeded. Please wait a moment and try again with a smaller area.")
+                    )
+                elif parcels_response.status_code != 200:
+                    response_text = parcels_response.text[:500]  # Limit error message length
+                    raise QgsProcessingException(
+                        self.tr("API request failed with status {}: {}".format(
+                            parcels_response.status_code, response_text
+                        ))
+                    )
+
+                try:
+                    parcels_data = json_loads(parcels_response.content)
+                except ValueError as e:
+                    raise QgsProcessingException(
+                        self.tr("Invalid JSON response from API. Please try again later.")
+                    )
+
+                # Handle the correct API response format
+                if parcels_data.get("success") and "data" in parcels_data:
+                    return parcels_data["data"]
+
                 error_msg = parcels_data.get("message", "Unknown error")
                 error_details = parcels_data.get("details", "")
                 if error_details:
@@ -427,6 +512,50 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
                 raise QgsProcessingException(
                     self.tr("API error: {}".format(error_msg))
                 )
+
+            feedback.pushInfo(self.tr("Requesting parcels within bounding box..."))
+            feedback.pushInfo(self.tr("Bounding box: [{:.6f}, {:.6f}, {:.6f}, {:.6f}]".format(
+                bbox_extent_4326.xMinimum(), bbox_extent_4326.yMinimum(),
+                bbox_extent_4326.xMaximum(), bbox_extent_4326.yMaximum()
+            )))
+
+            tiles = self._split_bbox(bbox_extent_4326, TILE_SIZE_DEGREES, MAX_BBOX_TILES)
+            if len(tiles) == 1:
+                parcel_fids = fetch_parcel_fids(tiles[0])
+            else:
+                feedback.pushInfo(self.tr("Splitting bounding box into {} tiles".format(len(tiles))))
+                tile_executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(len(tiles), TILE_WORKERS))
+                tile_futures = [tile_executor.submit(fetch_parcel_fids, tile) for tile in tiles]
+                tile_fids = []
+                try:
+                    for tile_future in tile_futures:
+                        # Wait in short steps so a cancellation is noticed while tiles download
+                        while not tile_future.done() and not feedback.isCanceled():
+                            concurrent.futures.wait([tile_future], timeout=0.5)
+                        if feedback.isCanceled():
+                            feedback.pushInfo(self.tr("Processing cancelled by user"))
+                            return {self.OUTPUT_PARCELS: dest_id}
+                        tile_fids.append(tile_future.result())
+                finally:
+                    for tile_future in tile_futures:
+                        tile_future.cancel()
+                    tile_executor.shutdown(wait=False)
+                # Parcels crossing a tile edge are returned by every tile they touch
+                parcel_fids = list(dict.fromkeys(chain.from_iterable(tile_fids)))
+
+            total_found = len(parcel_fids)
+            feedback.pushInfo(self.tr("Found {} parcels in the specified area".format(total_found)))
+
+            # Warn for large datasets
+            if total_found > 1000:
+                feedback.pushWarning(self.tr(
+                    "Large number of parcels found ({}). Processing may take several minutes. "
+                    "Consider using a smaller bounding box for faster results."
+                ).format(total_found))
+            elif total_found > 100:
+                feedback.pushInfo(self.tr(
+                    "Processing {} parcels. This may take a few minutes."
+                ).format(total_found))
             
             if not parcel_fids:
                 feedback.pushInfo(self.tr("No parcels found in the specified bounding box. "
@@ -451,19 +580,38 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
             
             feedback.pushInfo(self.tr("Processing {} parcels in batches of {}".format(total_found, batch_size)))
             
-            def download_parcel_info(fid_batch_info):
+            # Set by workers when the API still rate limits after retries
+            rate_limited = threading.Event()
+
+            def prepare_parcel_info(parcel_info):
+                """Convert hex or GeoJSON geometries to WKB on the worker thread so the main thread gets raw bytes."""
+                geom_data = parcel_info.get("geom")
+                if isinstance(geom_data, str) and len(geom_data) > 20 and geom_data[0] in '0123456789ABCDEFabcdef':
+                    try:
+                        parcel_info["geom_wkb"] = bytes.fromhex(geom_data)
+                    except ValueError:
+                        pass  # Not hex encoded, leave it to the WKT parser
+                elif isinstance(geom_data, dict) and geom_data.get("type") in ["Polygon", "MultiPolygon"]:
+                    try:
+                        wkb_bytes = self._geojson_to_wkb(geom_data)
+                    except (TypeError, ValueError, IndexError):
+                        wkb_bytes = None  # Malformed coordinates, reported as a geometry error
+                    if wkb_bytes:
+                        parcel_info["geom_wkb"] = wkb_bytes
+                return parcel_info
+
+            def download_parcel_info(fid):
                 """Download info for a single parcel. Returns (fid, success, feature_data_or_error)"""
-                fid, batch_index, total_in_batch = fid_batch_info
-                
                 try:
-                    info_payload = {"fid": str(fid)}
-                    info_response = requests.post(get_info_url, headers=headers, json=info_payload, timeout=20)
+                    # The headers already declare Content-Type: application/json
+                    info_payload = INFO_PAYLOAD_TEMPLATE % json.dumps(str(fid)).encode()
+                    info_response = session.post(get_info_url, headers=headers, data=info_payload, timeout=(5, 20))
                     
                     if info_response.status_code == 200:
                         try:
-                            info_data = info_response.json()
+                            info_data = json_loads(info_response.content)
                             if info_data.get("success") and "data" in info_data:
-                                return (fid, True, info_data["data"])
+                                return (fid, True, prepare_parcel_info(info_data["data"]))
                             else:
                                 return (fid, False, f"Invalid response format")
                         except ValueError:
@@ -471,6 +619,7 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
                     elif info_response.status_code == 404:
                         return (fid, False, f"Parcel not found")
                     elif info_response.status_code == 429:
+                        rate_limited.set()
                         return (fid, False, f"Rate limited")
                     else:
                         return (fid, False, f"HTTP {info_response.status_code}")
@@ -484,8 +633,13 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
             
             # Process parcels in batches
             total_parcels = len(parcel_fids)
+            total_batches = -(-total_parcels // batch_size)  # Ceiling division
+            fid_iter = iter(parcel_fids)
+
+            # Features are copied from a template so the field schema is only set up once
+            feature_template = QgsFeature(fields)
             
-            for batch_start in range(0, total_parcels, batch_size):
+            for batch_num in range(1, total_batches + 1):
                 if feedback.isCanceled():
                     feedback.pushInfo(self.tr("Processing cancelled by user"))
                     break
@@ -498,46 +652,58 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
                     ).format(error_count), fatalError=True)
                     break
                 
-                batch_end = min(batch_start + batch_size, total_parcels)
-                current_batch = parcel_fids[batch_start:batch_end]
-                batch_num = (batch_start // batch_size) + 1
-                total_batches = (total_parcels + batch_size - 1) // batch_size
+                current_batch = list(islice(fid_iter, batch_size))
+                batch_end = min(batch_num * batch_size, total_parcels)
                 
                 feedback.pushInfo(self.tr("Processing batch {}/{} ({} parcels)".format(
                     batch_num, total_batches, len(current_batch)
                 )))
+                # The FID range is only useful when debugging
+                if debug_logging:
+                    feedback.pushInfo(self.tr("Batch {} FIDs: {} to {}".format(
+                        batch_num, current_batch[0], current_batch[-1]
+                    )))
                 
-                # Prepare batch with additional info for progress tracking
-                batch_with_info = [(fid, i, len(current_batch)) for i, fid in enumerate(current_batch)]
-                
-                # Download batch concurrently with controlled thread pool
-                with concurrent.futures.ThreadPoolExecutor(max_workers=min(batch_size, 15)) as executor:
-                    future_to_fid = {
-                        executor.submit(download_parcel_info, fid_info): fid_info[0] 
-                        for fid_info in batch_with_info
-                    }
-                    
-                    batch_results = []
-                    for future in concurrent.futures.as_completed(future_to_fid):
-                        if feedback.isCanceled():
-                            # Cancel remaining futures
-                            for f in future_to_fid:
-                                f.cancel()
-                            break
-                            
+                # Download batch concurrently on the shared thread pool
+                if executor is None:
+                    executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(batch_size, MAX_WORKERS))
+                future_to_info = {
+                    executor.submit(download_parcel_info, fid): (fid, batch_index)
+                    for batch_index, fid in enumerate(current_batch)
+                }
+            
+                # Results are slotted by position so features keep the API's parcel order
+                batch_results = [None] * len(current_batch)
+                pending = set(future_to_info)
+                while pending:
+                    if feedback.isCanceled():
+                        # Drop queued downloads and return without waiting for running ones
+                        # (cancelled explicitly as shutdown(cancel_futures=True) needs Python 3.9)
+                        for future in pending:
+                            future.cancel()
+                        executor.shutdown(wait=False)
+                        executor = None
+                        break
+
+                    # Wait in short steps so a cancellation is noticed while requests are in flight
+                    done, pending = concurrent.futures.wait(
+                        pending, timeout=0.5, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        fid, batch_index = future_to_info[future]
                         try:
-                            result = future.result(timeout=25)  # Timeout for individual results
-                            batch_results.append(result)
-                        except concurrent.futures.TimeoutError:
-                            fid = future_to_fid[future]
-                            batch_results.append((fid, False, "Processing timeout"))
+                            batch_results[batch_index] = future.result()
                         except Exception as e:
-                            fid = future_to_fid[future]
-                            batch_results.append((fid, False, f"Future error: {str(e)[:100]}"))
-                
+                            batch_results[batch_index] = (fid, False, f"Future error: {str(e)[:100]}")
+
+                # Slots of downloads dropped by a cancellation stay empty
+                batch_results = [result for result in batch_results if result is not None]
+            
                 # Process results from this batch
                 batch_processed = 0
                 batch_errors = 0
+                batch_warnings = []
+                batch_features = []
                 
                 for fid, success, data_or_error in batch_results:
                     if feedback.isCanceled():
@@ -548,107 +714,62 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
                         
                         try:
                             # Create QGIS feature
-                            feat = QgsFeature(fields)
-                            
-                            # Set attributes with safe type conversion
-                            feat["fid"] = str(fid)
-                            feat["gml_id"] = str(parcel_info.get("gml_id", ""))
-                            feat["administrativeunit"] = str(parcel_info.get("administrativeunit", ""))
-                            feat["comune_name"] = str(parcel_info.get("comune_name", ""))
+                            feat = QgsFeature(feature_template)
                             
-                            # Safely convert numeric fields
-                            feat["footprint_sqm"] = float(parcel_info.get("footprint_sqm", 0.0)) if parcel_info.get("footprint_sqm") is not None else 0.0
-                            feat["elevation_min"] = float(parcel_info.get("elevation_min", 0.0)) if parcel_info.get("elevation_min") is not None else 0.0
-                            feat["elevation_max"] = float(parcel_info.get("elevation_max", 0.0)) if parcel_info.get("elevation_max") is not None else 0.0
-                            feat["densita_abitativa"] = float(parcel_info.get("densita_abitativa", 0.0)) if parcel_info.get("densita_abitativa") is not None else 0.0
-                            feat["eta_media"] = float(parcel_info.get("eta_media", 0.0)) if parcel_info.get("eta_media") is not None else 0.0
-                            feat["tasso_occupazione"] = float(parcel_info.get("tasso_occupazione", 0.0)) if parcel_info.get("tasso_occupazione") is not None else 0.0
-                            feat["buildings_count"] = int(parcel_info.get("buildings_count", 0)) if parcel_info.get("buildings_count") is not None else 0
-                            
-                            feat["class"] = str(parcel_info.get("class", ""))
-                            feat["subtype"] = str(parcel_info.get("subtype", ""))
-                            feat["landcover"] = str(parcel_info.get("landcover", ""))
-                            feat["flood_risk"] = str(parcel_info.get("flood_risk", ""))
-                            feat["landslide_risk"] = str(parcel_info.get("landslide_risk", ""))
-                            feat["seismic_risk"] = str(parcel_info.get("seismic_risk", ""))
+                            # Set attributes positionally with safe type conversion
+                            attributes = [str(fid)]
+                            for name, _, convert, default in PARCEL_ATTRIBUTES:
+                                value = parcel_info.get(name)
+                                attributes.append(default if value is None else convert(value))
+
+                            # Precompute the map label so rendering does not evaluate an expression
+                            parcel_class = parcel_info.get("class")
+                            attributes.append("{}\n{}".format(fid, parcel_class) if parcel_class else str(fid))
+                            feat.setAttributes(attributes)
                             
                             # Handle geometry processing with improved error handling
                             geometry_processed = False
                             if "geom" in parcel_info and parcel_info["geom"]:
                                 geom_data = parcel_info["geom"]
                                 try:
-                                    if isinstance(geom_data, dict) and geom_data.get("type") in ["Polygon", "MultiPolygon"]:
-                                        # Handle GeoJSON format - convert to WKT
-                                        coordinates = geom_data.get("coordinates", [])
-                                        if coordinates:
-                                            if geom_data.get("type") == "MultiPolygon":
-                                                polygons = []
-                                                for polygon in coordinates:
-                                                    rings = []
-                                                    for ring in polygon:
-                                                        if len(ring) >= 4:  # Valid ring needs at least 4 points
-                                                            ring_coords = ", ".join([f"{coord[0]} {coord[1]}" for coord in ring])
-                                                            rings.append(f"({ring_coords})")
-                                                    if rings:
-                                                        polygons.append(f"({', '.join(rings)})")
-                                                if polygons:
-                                                    wkt = f"MULTIPOLYGON({', '.join(polygons)})"
-                                                    qgis_geom = QgsGeometry.fromWkt(wkt)
-                                            else:  # Polygon
-                                                rings = []
-                                                for ring in coordinates:
-                                                    if len(ring) >= 4:
-                                                        ring_coords = ", ".join([f"{coord[0]} {coord[1]}" for coord in ring])
-                                                        rings.append(f"({ring_coords})")
-                                                if rings:
-                                                    wkt = f"POLYGON({', '.join(rings)})"
-                                                    qgis_geom = QgsGeometry.fromWkt(wkt)
-                                            
-                                            if 'qgis_geom' in locals() and not qgis_geom.isEmpty() and qgis_geom.isGeosValid():
-                                                feat.setGeometry(qgis_geom)
-                                                geometry_processed = True
-                                                if processed_count == 0:
-                                                    feedback.pushInfo(self.tr("Successfully parsing GeoJSON geometries"))
-                                    
+                                    if "geom_wkb" in parcel_info:
+                                        # Handle WKB prepared from hex or GeoJSON by the download worker
+                                        qgis_geom = QgsGeometry()
+                                        qgis_geom.fromWkb(parcel_info["geom_wkb"])
+
+                                        if not qgis_geom.isEmpty() and (not validate_geometries or qgis_geom.isGeosValid()):
+                                            feat.setGeometry(qgis_geom)
+                                            geometry_processed = True
+
                                     elif isinstance(geom_data, str):
-                                        # Handle WKB hex string
-                                        if len(geom_data) > 20 and all(c in '0123456789ABCDEFabcdef' for c in geom_data):
-                                            wkb_bytes = bytes.fromhex(geom_data)
-                                            qgis_geom = QgsGeometry()
-                                            qgis_geom.fromWkb(wkb_bytes)
-                                            
-                                            if not qgis_geom.isEmpty() and qgis_geom.isGeosValid():
-                                                feat.setGeometry(qgis_geom)
-                                                geometry_processed = True
-                                        else:
-                                            # Try as WKT format
-                                            qgis_geom = QgsGeometry.fromWkt(geom_data)
-                                            if not qgis_geom.isEmpty():
-                                                feat.setGeometry(qgis_geom)
-                                                geometry_processed = True
+                                        # Try as WKT format
+                                        qgis_geom = QgsGeometry.fromWkt(geom_data)
+                                        if not qgis_geom.isEmpty():
+                                            feat.setGeometry(qgis_geom)
+                                            geometry_processed = True
                                     
                                     if not geometry_processed:
                                         error_count += 1
                                         batch_errors += 1
                                         if batch_errors <= 3:  # Only log first few errors per batch
-                                            feedback.pushWarning(self.tr("Could not process geometry for parcel FID {}".format(fid)))
+                                            batch_warnings.append("Could not process geometry for parcel FID {}".format(fid))
                                         continue
                                         
                                 except Exception as e:
                                     error_count += 1
                                     batch_errors += 1
                                     if batch_errors <= 3:
-                                        feedback.pushWarning(self.tr("Geometry error for parcel FID {}: {}".format(fid, str(e)[:100])))
+                                        batch_warnings.append("Geometry error for parcel FID {}: {}".format(fid, str(e)[:100]))
                                     continue
                             else:
                                 error_count += 1
                                 batch_errors += 1
                                 if batch_errors <= 3:
-                                    feedback.pushWarning(self.tr("No geometry data for parcel FID {}".format(fid)))
+                                    batch_warnings.append("No geometry data for parcel FID {}".format(fid))
                                 continue
 
-                            # Add feature to output
-                            sink.addFeature(feat, QgsFeatureSink.Flag.FastInsert)
+                            # Queue feature for output
+                            batch_features.append(feat)
                             processed_count += 1
                             batch_processed += 1
                             
@@ -656,26 +777,40 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
                             error_count += 1
                             batch_errors += 1
                             if batch_errors <= 3:
-                                feedback.pushWarning(self.tr("Error creating feature for FID {}: {}".format(fid, str(e)[:100])))
+                                batch_warnings.append("Error creating feature for FID {}: {}".format(fid, str(e)[:100]))
                         
                     else:
                         error_count += 1
                         batch_errors += 1
                         if batch_errors <= 3:
-                            feedback.pushWarning(self.tr("Failed to get info for parcel FID {}: {}".format(fid, data_or_error)))
+                            batch_warnings.append("Failed to get info for parcel FID {}: {}".format(fid, data_or_error))
                 
+                # Write the whole batch to the output in one call
+                if batch_features:
+                    sink.addFeatures(batch_features, QgsFeatureSink.Flag.FastInsert)
+
+                # Report the first few errors of the batch in one message
+                if batch_warnings:
+                    feedback.pushWarning("\n".join(batch_warnings))
+
                 # Update progress after each batch
-                progress = int((batch_end) / total_parcels * 100)
+                progress = int(batch_end / total_parcels * 100)
                 feedback.setProgress(progress)
                 
                 feedback.pushInfo(self.tr("Batch {}/{} completed: {} processed, {} errors. Total: {} parcels".format(
                     batch_num, total_batches, batch_processed, batch_errors, processed_count
                 )))
                 
-                # Add small delay between batches to be respectful to API
+                # Add small delay between batches to be respectful to API,
+                # backing off further while the API keeps rate limiting us
                 if batch_num < total_batches and not feedback.isCanceled():
                     import time
-                    time.sleep(0.5)
+                    if rate_limited.is_set():
+                        rate_limited.clear()
+                        feedback.pushInfo(self.tr("API rate limit reached, pausing before the next batch"))
+                        time.sleep(5)
+                    else:
+                        time.sleep(0.5)
             
             # Final summary
             feedback.pushInfo(self.tr("Processing completed! Successfully processed {} out of {} parcels".format(
@@ -700,6 +835,9 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
         except Exception as e:
             feedback.reportError(self.tr("Unexpected error: {}. Please report this issue.".format(str(e))), fatalError=True)
             return {}
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
 
         # Store the result for styling
         result = {self.OUTPUT_PARCELS: dest_id}
@@ -713,6 +851,67 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
 
         return result
 
+    @staticmethod
+    def _split_bbox(extent, tile_size: float, max_tiles: int) -> list:
+        """Split an extent into a grid of (xmin, ymin, xmax, ymax) tiles.
+
+        Tiles are at most tile_size per side unless that would need more than
+        max_tiles tiles, in which case they are enlarged to keep within the cap.
+        """
+        x_min, y_min = extent.xMinimum(), extent.yMinimum()
+        x_max, y_max = extent.xMaximum(), extent.yMaximum()
+        columns = max(1, math.ceil((x_max - x_min) / tile_size))
+        rows = max(1, math.ceil((y_max - y_min) / tile_size))
+        if columns * rows > max_tiles:
+            # Shrink both grid dimensions by the same factor so tiles stay roughly square
+            scale = math.sqrt(columns * rows / max_tiles)
+            rows = min(max_tiles, max(1, math.floor(rows / scale)))
+            columns = max(1, min(columns, max_tiles // rows))
+        width = (x_max - x_min) / columns
+        height = (y_max - y_min) / rows
+
+        tiles = []
+        for row in range(rows):
+            tile_y_min = y_min + row * height
+            tile_y_max = y_max if row == rows - 1 else tile_y_min + height
+            for column in range(columns):
+                tile_x_min = x_min + column * width
+                tile_x_max = x_max if column == columns - 1 else tile_x_min + width
+                tiles.append((tile_x_min, tile_y_min, tile_x_max, tile_y_max))
+        return tiles
+
+    def _geojson_to_wkb(self, geom_data: dict) -> Optional[bytes]:
+        """Pack a GeoJSON Polygon or MultiPolygon into WKB, or return None if no ring is usable."""
+        coordinates = geom_data.get("coordinates") or []
+        if geom_data.get("type") != "MultiPolygon":
+            return self._polygon_wkb(coordinates)
+
+        polygons = [self._polygon_wkb(rings) for rings in coordinates]
+        polygons = [polygon for polygon in polygons if polygon]
+        if not polygons:
+            return None
+        return struct.pack("=BII", WKB_BYTE_ORDER, WKB_MULTIPOLYGON, len(polygons)) + b"".join(polygons)
+
+    def _polygon_wkb(self, rings: list) -> Optional[bytes]:
+        """Pack GeoJSON polygon rings into WKB, skipping rings with fewer than 4 points."""
+        parts = []
+        for ring in rings:
+            if len(ring) < 4:  # Valid ring needs at least 4 points
+                continue
+
+            # 2D rings flatten straight into a C double array
+            coords = array("d", chain.from_iterable(ring))
+            if len(coords) != 2 * len(ring):
+                # Drop Z/M values from 3D or 4D coordinates
+                coords = array("d", chain.from_iterable((coord[0], coord[1]) for coord in ring))
+
+            parts.append(struct.pack("=I", len(ring)))
+            parts.append(coords.tobytes())
+
+        if not parts:
+            return None
+        return struct.pack("=BII", WKB_BYTE_ORDER, WKB_POLYGON, len(parts) // 2) + b"".join(parts)
+
     def _apply_beautiful_styling(self, layer_id: str, context: QgsProcessingContext, feedback: QgsProcessingFeedback):
         """Apply beautiful symbology and labels to the parcel layer."""
         
@@ -802,14 +1001,16 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
             if not land_class or land_class == 'null':
                 continue
                 
-            # Determine color based on land use keywords
-            fill_color = land_use_colors.get('other')  # Default
-            
-            # Match land use to color scheme
-            for keyword, color in land_use_colors.items():
-                if keyword in land_class:
-                    fill_color = color
-                    break
+            # Exact class names hit the color scheme with a single lookup
+            fill_color = land_use_colors.get(land_class)
+
+            # Otherwise match land use keywords against the class name
+            if fill_color is None:
+                fill_color = land_use_colors.get('other')  # Default
+                for keyword, color in land_use_colors.items():
+                    if keyword in land_class:
+                        fill_color = color
+                        break
             
             # Create symbol with semi-transparent fill and contrasting stroke
             symbol = QgsFillSymbol.createSimple({
@@ -864,16 +1065,9 @@ class ParcelDownloaderAlgorithm(QgsProcessingAlgorithm):
         # Create label settings
         label_settings = QgsPalLayerSettings()
         
-        # Set label expression - show FID and land use class
-        label_settings.fieldName = '''
-        CASE 
-            WHEN "class" IS NOT NULL AND "class" != '' THEN
-                "fid" || '\n' || "class"
-            ELSE
-                "fid"
-        END
-        '''
-        label_settings.isExpression = True
+        # Label with the precomputed FID and land use class field
+        label_settings.fieldName = "label"
+        label_settings.isExpression = False
         
         # Text formatting
         text_format = QgsTextFormat()
@@ -8,6 +8,16 @@ import zipfile
 import sys
 from pathlib import Path
 
+# Already-compressed formats gain nothing from deflate, so store them as-is
+PRECOMPRESSED_SUFFIXES = (".png", ".jpg", ".jpeg", ".zip")
+
+
+def compress_type_for(filename):
+    """Return the ZIP compression method to use for a file."""
+    if filename.lower().endswith(PRECOMPRESSED_SUFFIXES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
 def create_plugin_zip():
     """Create a ZIP file for the QGIS plugin."""
     
@@ -39,24 +49,33 @@ def create_plugin_zip():
     
     print(f"Creating plugin ZIP: {zip_path}")
     
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+    # Walk the plugin directory once instead of stat-ing each candidate file
+    wanted = frozenset(files_to_include + optional_files)
+    with os.scandir(plugin_dir) as entries:
+        available = {
+            entry.name: entry.path
+            for entry in entries
+            if entry.name in wanted and entry.is_file()
+        }
+    
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zip_file:
         # Add required files
         for filename in files_to_include:
-            file_path = plugin_dir / filename
-            if file_path.exists():
+            file_path = available.get(filename)
+            if file_path is not None:
                 # Add file to ZIP with plugin directory structure
                 arcname = f"{plugin_name}/{filename}"
-                zip_file.write(file_path, arcname)
+                zip_file.write(file_path, arcname, compress_type=compress_type_for(filename))
                 print(f"Added: {filename}")
             else:
                 print(f"Warning: Required file not found: {filename}")
         
         # Add optional files if they exist
         for filename in optional_files:
-            file_path = plugin_dir / filename
-            if file_path.exists():
+            file_path = available.get(filename)
+            if file_path is not None:
                 arcname = f"{plugin_name}/{filename}"
-                zip_file.write(file_path, arcname)
+                zip_file.write(file_path, arcname, compress_type=compress_type_for(filename))
                 print(f"Added: {filename}")
     
     print(f"\nPlugin ZIP created successfully: {zip_filename}")
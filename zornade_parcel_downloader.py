@@ -40,6 +40,7 @@ class ZornadeParcelDownloader:
             'i18n',
             'ZornadeParcelDownloader_{}.qm'.format(locale))
 
+        self.translator = None
         if os.path.exists(locale_path):
             self.translator = QTranslator()
             self.translator.load(locale_path)
@@ -52,6 +53,9 @@ class ZornadeParcelDownloader:
         # Initialize processing provider
         self.provider = None
 
+        # Processing toolbox action, looked up once for the run() fallback
+        self.toolbox_action = None
+
     def tr(self, message):
         """Get the translation for a string using Qt translation API.
 
@@ -117,6 +121,12 @@ class ZornadeParcelDownloader:
         # Initialize processing provider
         self.initProcessing()
 
+        self.toolbox_action = self.find_toolbox_action()
+
+    def find_toolbox_action(self):
+        """Return the Processing toolbox action from the main window, if loaded."""
+        return self.iface.mainWindow().findChild(QAction, 'mProcessingUserMenu_Toolbox')
+
     def initProcessing(self):
         """Create the Processing provider"""
         self.provider = ParcelDownloaderProvider()
@@ -134,6 +144,11 @@ class ZornadeParcelDownloader:
         if self.provider:
             QgsApplication.processingRegistry().removeProvider(self.provider)
 
+        # Uninstall the translator so plugin reloads do not stack copies of it
+        if self.translator is not None:
+            QCoreApplication.removeTranslator(self.translator)
+            self.translator = None
+
     def run(self):
         """Run method that opens the Processing algorithm."""
         from qgis import processing
@@ -141,27 +156,19 @@ class ZornadeParcelDownloader:
         try:
             processing.execAlgorithmDialog('zornadeapi:ZornadeParcelDownloader')
         except Exception as e:
-            # Fallback: try to open processing toolbox via menu
+            # Fallback: try to open processing toolbox via its action
             try:
                 from qgis.utils import iface
-                from qgis.PyQt.QtWidgets import QApplication
-                
-                # Try to find and trigger the processing menu action
-                main_window = iface.mainWindow()
-                menubar = main_window.menuBar()
                 
-                # Look for Processing menu
-                for action in menubar.actions():
-                    if 'processing' in action.text().lower() or 'toolbox' in action.text().lower():
-                        # Find the toolbox action in the submenu
-                        if action.menu():
-                            for sub_action in action.menu().actions():
-                                if 'toolbox' in sub_action.text().lower():
-                                    sub_action.trigger()
-                                    return
-                        break
+                # The Processing plugin may load after this one, so retry the lookup once
+                if self.toolbox_action is None:
+                    self.toolbox_action = self.find_toolbox_action()
+                if self.toolbox_action is not None:
+                    # The action is checkable; trigger() would close an already open toolbox
+                    self.toolbox_action.setChecked(True)
+                    return
                 
-                # If menu approach fails, show a message
+                # If the toolbox action is unavailable, show a message
                 from qgis.PyQt.QtWidgets import QMessageBox
                 QMessageBox.information(
                     iface.mainWindow(),